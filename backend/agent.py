@@ -1,41 +1,216 @@
 from langgraph.prebuilt import create_react_agent
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_tavily import TavilySearch
-from langchain_core.tools import BaseTool, tool
+from langchain_core.tools import BaseTool
 from langchain_core.tools.base import ArgsSchema
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.rate_limiters import InMemoryRateLimiter
+from langchain_core.runnables.config import get_async_callback_manager_for_config
 from pydantic import BaseModel, Field
 from typing import Optional
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from clients import sync_client, async_client, timeout as http_timeout
+from cache import TTLCache, normalize, tool_cache
+from coalesce import SingleFlight
+from metrics import RequestTracer, upstream_error
+from compaction import compact
+from resilience import REQUEST_TIMEOUT, LLMGuard, Unavailable, budget, deadline_bound, llm_breaker, set_deadline, upstreams
+import asyncio
+import httpx
+import json
 import os
+import re
 
 load_dotenv()
 
-llm = ChatGoogleGenerativeAI(model='gemini-2.0-flash', api_key=os.getenv('GEMINI_API_KEY'))
+# GEMINI_API_ENDPOINT (host:port) points the model's default gRPC transport at another server, such as the bench stubs
+llm_endpoint = {"client_options": {"api_endpoint": os.getenv('GEMINI_API_ENDPOINT')}} if os.getenv('GEMINI_API_ENDPOINT') else {}
+
+llm = ChatGoogleGenerativeAI(
+    model='gemini-2.0-flash',
+    api_key=os.getenv('GEMINI_API_KEY'),
+    timeout=float(os.getenv('LLM_TIMEOUT', 30)),
+    max_retries=int(os.getenv('LLM_MAX_RETRIES', 2)),
+    rate_limiter=InMemoryRateLimiter(
+        requests_per_second=float(os.getenv('GEMINI_RATE', 15)),
+        max_bucket_size=float(os.getenv('GEMINI_BURST', 15))
+    ),
+    callbacks=[LLMGuard(llm_breaker)],
+    **llm_endpoint
+)
+
+def error_payload(name: str, result) -> dict:
+    """A failed lookup as the JSON-safe {"error": ...} payload the agent and tracer recognise"""
+    if isinstance(result, dict) and "error" in result:
+        return {"error": str(result["error"])}
+    return {"error": f"{name} returned no usable data", "response": result}
 
 # TOOL 1: Tavily Search
 
-search_tool = TavilySearch(
+tavily_pool = ThreadPoolExecutor(max_workers=int(os.getenv('TAVILY_SYNC_WORKERS', 8)))
+
+class CachedTavilySearch(TavilySearch):
+    cache_ttl: int = int(os.getenv('TAVILY_CACHE_TTL', 3600))
+
+    def _cache_key(self, query: str, kwargs: dict) -> str:
+        return query + json.dumps(kwargs, sort_keys=True, default=str)
+
+    def _run(self, query: str, run_manager=None, **kwargs):
+        key = self._cache_key(query, kwargs)
+        result = tool_cache.get(self.name, key)
+        if result is None:
+            upstream = upstreams[self.name]
+            try:
+                upstream.admit()
+                capped = deadline_bound(http_timeout.read)
+                # the sync Tavily client has no timeout of its own, so it is waited on from a worker thread
+                search = tavily_pool.submit(super()._run, query, run_manager=run_manager, **kwargs)
+                result = search.result(budget(http_timeout.read))
+            except Unavailable as e:
+                return {"error": str(e)}
+            except TimeoutError as e:
+                upstream.record_timeout(e, capped)
+                return {"error": f"{self.name} timed out"}
+            result = self._remember(key, result)
+        return compact(self.name, result)
+
+    async def _arun(self, query: str, run_manager=None, **kwargs):
+        key = self._cache_key(query, kwargs)
+        result = tool_cache.get(self.name, key)
+        if result is None:
+            upstream = upstreams[self.name]
+            try:
+                await upstream.aadmit()
+                capped = deadline_bound(http_timeout.read)
+                result = await asyncio.wait_for(
+                    super()._arun(query, run_manager=run_manager, **kwargs), budget(http_timeout.read)
+                )
+            except Unavailable as e:
+                return {"error": str(e)}
+            except asyncio.TimeoutError as e:
+                upstream.record_timeout(e, capped)
+                return {"error": f"{self.name} timed out"}
+            result = self._remember(key, result)
+        return compact(self.name, result)
+
+    def valid(self, result) -> bool:
+        return isinstance(result, dict) and "error" not in result
+
+    def _remember(self, key: str, result):
+        # langchain_tavily reports failures as {"error": <exception>}, which is not JSON
+        if not self.valid(result):
+            upstreams[self.name].breaker.failure()
+            upstream_error(self.name)
+            return error_payload(self.name, result)
+        upstreams[self.name].breaker.success()
+        tool_cache.set(self.name, key, result, self.cache_ttl)
+        return result
+
+search_tool = CachedTavilySearch(
     max_results=5,
-    topic="general"
+    topic="general",
+    **({"api_base_url": os.getenv('TAVILY_BASE_URL')} if os.getenv('TAVILY_BASE_URL') else {})
 )
 
-# TOOL 2: Weather API
-
 class Place(BaseModel):
     place: str = Field(description="place")
 
-class WeatherTool(BaseTool):
-    name: str = "weather_tool"
-    description: str = "A tool to fetch current weather details given a place."
+class HttpTool(BaseTool):
+    """Base for tools that GET a JSON endpoint for a place over the shared pooled clients"""
+    url: str
+    # query parameters carrying the place and the API key, and the env var holding that key
+    place_param: str
+    key_param: str
+    key_env: str
+    cache_ttl: int = 0
     args_schema: Optional[ArgsSchema] = Place
 
+    def params(self, place: str) -> dict:
+        return {self.place_param: place, self.key_param: os.getenv(self.key_env)}
+
     def _run(self, place: str):
-        """Use the tool to hit weather endpoint and fetch current weather details given a place"""
-        api_key = os.getenv('WEATHERBIT_API_KEY')
-        url = f"https://api.weatherbit.io/v2.0/current?city={place}&key={api_key}"
-        response = requests.get(url)
-        return response.json()
+        return compact(self.name, self.fetch(place))
+
+    async def _arun(self, place: str):
+        return compact(self.name, await self.afetch(place))
+
+    def fetch(self, place: str):
+        """Raw upstream payload for a place, served from the tool cache when fresh"""
+        # an unavailable upstream yields an error payload instead of raising, so the agent
+        # carries on with whatever the other tools returned
+        cached = tool_cache.get(self.name, place)
+        if cached is not None:
+            return cached
+        try:
+            upstreams[self.name].admit()
+            capped = deadline_bound(http_timeout.read)
+            response = sync_client.get(self.url, params=self.params(place), timeout=self.request_timeout())
+        except Unavailable as e:
+            return {"error": str(e)}
+        except httpx.HTTPError as e:
+            return self._failed(e, capped)
+        return self._remember(place, response)
+
+    async def afetch(self, place: str):
+        cached = tool_cache.get(self.name, place)
+        if cached is not None:
+            return cached
+        try:
+            await upstreams[self.name].aadmit()
+            capped = deadline_bound(http_timeout.read)
+            response = await async_client.get(self.url, params=self.params(place), timeout=self.request_timeout())
+        except Unavailable as e:
+            return {"error": str(e)}
+        except httpx.HTTPError as e:
+            return self._failed(e, capped)
+        return self._remember(place, response)
+
+    def request_timeout(self) -> httpx.Timeout:
+        # never wait on an upstream past the request's own deadline
+        return httpx.Timeout(budget(http_timeout.read), connect=budget(http_timeout.connect))
+
+    def _failed(self, error: Exception, capped: bool):
+        upstream = upstreams[self.name]
+        if isinstance(error, httpx.TimeoutException):
+            upstream.record_timeout(error, capped)
+        else:
+            upstream.breaker.failure()
+            upstream_error(self.name, error)
+        return {"error": f"{self.name} request failed: {type(error).__name__}"}
+
+    def valid(self, result) -> bool:
+        """Whether a payload is a real answer worth caching, upstreams also report errors with HTTP 200"""
+        return isinstance(result, dict) and "error" not in result and "errors" not in result
+
+    def _remember(self, place: str, response):
+        # only valid upstream answers are cached, errors are retried on the next call
+        try:
+            result = response.json()
+        except ValueError:
+            result = {"error": f"{self.name} returned HTTP {response.status_code}"}
+        if response.status_code >= 500 or response.status_code == 429:
+            upstreams[self.name].breaker.failure()
+        else:
+            upstreams[self.name].breaker.success()
+        if not response.is_success:
+            upstream_error(self.name, kind="status")
+        if not self.valid(result):
+            return error_payload(self.name, result)
+        if self.cache_ttl:
+            tool_cache.set(self.name, place, result, self.cache_ttl)
+        return result
+
+# TOOL 2: Weather API
+
+class WeatherTool(HttpTool):
+    name: str = "weather_tool"
+    description: str = "A tool to fetch current weather details given a place."
+    url: str = os.getenv('WEATHERBIT_URL', "https://api.weatherbit.io/v2.0/current")
+    cache_ttl: int = int(os.getenv('WEATHER_CACHE_TTL', 600))
+    place_param: str = "city"
+    key_param: str = "key"
+    key_env: str = "WEATHERBIT_API_KEY"
     
 getweather_tool = WeatherTool()
     
@@ -50,52 +225,384 @@ getweather_tool = WeatherTool()
 
 # TOOL 3: News API
 
-class NewsTool(BaseTool):
+class NewsTool(HttpTool):
     name: str = "news_tool"
     description: str = "A tool to perform news search about a given place."
-    args_schema: Optional[ArgsSchema] = Place
-
-    def _run(self, place: str):
-        """Use the tool to hit news endpoint and fetch any related news about a given place"""
-        api_key = os.getenv('GNEWS_API_KEY')
-        url = f"https://gnews.io/api/v4/search?q={place}&apikey={api_key}"
-        response = requests.get(url)
-        return response.json()
+    url: str = os.getenv('GNEWS_URL', "https://gnews.io/api/v4/search")
+    cache_ttl: int = int(os.getenv('NEWS_CACHE_TTL', 900))
+    place_param: str = "q"
+    key_param: str = "apikey"
+    key_env: str = "GNEWS_API_KEY"
     
 getnews_tool = NewsTool()
     
 # TOOL 4: Places API
 
-class PlaceTool(BaseTool):
+class PlaceTool(HttpTool):
     name: str = "places_tool"
     description: str = "A tool to hit Google Places API. Useful for when you need place details from a query."
-    args_schema: Optional[ArgsSchema] = Place
+    url: str = os.getenv('GPLACES_URL', "https://maps.googleapis.com/maps/api/geocode/json")
+    cache_ttl: int = int(os.getenv('PLACES_CACHE_TTL', 30 * 24 * 3600))
+    place_param: str = "address"
+    key_param: str = "key"
+    key_env: str = "GPLACES_API_KEY"
 
-    def _run(self, place: str):
-        """Use the tool to hit google places endpoint and fetch details given a place"""
-        api_key = os.getenv('GPLACES_API_KEY')
-        url = f"https://maps.googleapis.com/maps/api/geocode/json?address={place}&key={api_key}"
-        response = requests.get(url)
-        return response.json()
+    def valid(self, result) -> bool:
+        # Google answers quota and key problems with HTTP 200 and a non-OK status
+        return super().valid(result) and result.get("status") == "OK"
     
 getplaces_tool = PlaceTool()
 
 tools = [getnews_tool, getplaces_tool, search_tool, getweather_tool] 
 
+SYSTEM_PROMPT = (
+    "You are a travel planner, Cassandra, that collates all the current information about a given place such as address details, current news, weather information and any related online result about the place."
+    "Your response MUST have positive and negative points regarding travelling to the place along with your recommendation to travel or not."
+    "Include top things to do or visit."
+    "You MUST only respond precisely in 100 words."
+)
+
 agent = create_react_agent(
     llm,
     tools,
-    state_modifier=(
-        "You are a travel planner, Cassandra, that collates all the current information about a given place such as address details, current news, weather information and any related online result about the place."
-        "Your response MUST have positive and negative points regarding travelling to the place along with your recommendation to travel or not."
-        "Include top things to do or visit."
-        "You MUST only respond precisely in 100 words."
+    state_modifier=SYSTEM_PROMPT
+)
+
+# FAST PATH: fan out to every tool for the destination, then one summarization call
+
+AGENT_MODE = os.getenv('AGENT_MODE', 'fast')
+
+MONTHS = {
+    "january", "february", "march", "april", "may", "june", "july",
+    "august", "september", "october", "november", "december"
+}
+
+# words that commonly open a query or sentence, capitalised there without naming a place
+SENTENCE_OPENERS = {
+    "what", "which", "where", "when", "why", "how", "who", "whats", "is", "are", "was", "can", "could",
+    "should", "would", "will", "do", "does", "did", "any", "it", "its", "this", "that", "there", "theres",
+    "we", "you", "he", "she", "they", "my", "our", "me", "hi", "hello", "hey", "please", "thanks", "also",
+    "and", "but", "so", "or", "then", "now", "ok", "okay", "plan", "planning", "tell", "show", "give",
+    "find", "suggest", "recommend", "help", "let", "lets", "want", "thinking", "looking", "going"
+}
+
+# "I" and its contractions are capitalised without being places, so a name never runs on into them
+DESTINATION_PATTERN = re.compile(
+    r"\b(?:to|visit|visiting|in|at|about|for|around)\s+([A-Z][\w'-]*(?:\s+(?!I\b|I')[A-Z][\w'-]*)*)"
+)
+
+def extract_destination(user_input: str) -> Optional[str]:
+    """Return the single destination named in the query, or None when there is none or several"""
+    query = user_input.strip()
+    # a bare place name such as "Dubai" or "New York"
+    if re.fullmatch(r"[A-Z][\w'-]*(?:\s+[A-Z][\w'-]*){0,3}", query):
+        return query
+    candidates = {
+        match.strip()
+        for match in DESTINATION_PATTERN.findall(query)
+        if match.split()[0].lower() not in MONTHS
+    }
+    if len(candidates) != 1:
+        return None
+    destination = candidates.pop()
+    # any other proper noun, e.g. "Lisbon or Porto", means more than one place is in play; "I", "I'm"
+    # and known openers such as "What" or "Is" starting a sentence do not count, "Rome or Oslo?" does
+    others = set()
+    for sentence in re.split(r"[.!?]+", query):
+        for position, word in enumerate(re.findall(r"[\w'-]+", sentence)):
+            if not word[0].isupper() or re.fullmatch(r"I(?:'\w+)?", word) or word.lower() in MONTHS:
+                continue
+            if position == 0 and re.sub(r"'s$", "", word.lower()) in SENTENCE_OPENERS:
+                continue
+            others.add(word)
+    others -= set(destination.split())
+    if others:
+        return None
+    return destination
+
+def fan_out_calls(place: str) -> list:
+    return [
+        (getplaces_tool, {"place": place}),
+        (getnews_tool, {"place": place}),
+        (getweather_tool, {"place": place}),
+        (search_tool, {"query": f"tourism in {place}"})
+    ]
+
+def summary_messages(user_input: str, results: dict) -> list:
+    tool_data = "\n".join(
+        f"{name}: {json.dumps(result, ensure_ascii=False, default=str)}" for name, result in results.items()
+    )
+    return [
+        SystemMessage(content=SYSTEM_PROMPT),
+        HumanMessage(content=f"{user_input}\n\nCurrent information gathered about the place:\n{tool_data}")
+    ]
+
+def fan_out(place: str, config=None) -> dict:
+    calls = fan_out_calls(place)
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        futures = {tool.name: pool.submit(tool.invoke, args, config) for tool, args in calls}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            results[name] = {"error": str(e)}
+    return results
+
+async def afan_out(place: str, config=None) -> dict:
+    calls = fan_out_calls(place)
+    outputs = await asyncio.gather(*(tool.ainvoke(args, config) for tool, args in calls), return_exceptions=True)
+    return {
+        tool.name: {"error": str(output)} if isinstance(output, Exception) else output
+        for (tool, _), output in zip(calls, outputs)
+    }
+
+# ANSWER CACHE: identical queries within a short window share one agent run
+
+ANSWER_CACHE_TTL = int(os.getenv('ANSWER_CACHE_TTL', 120))
+# answers built while a tool was failing are kept only briefly so they are rebuilt once it recovers
+DEGRADED_ANSWER_TTL = int(os.getenv('DEGRADED_ANSWER_TTL', 10))
+
+answer_cache = TTLCache(maxsize=int(os.getenv('ANSWER_CACHE_SIZE', 256)))
+answer_flight = SingleFlight()
+
+def remember_answer(user_input, mode, answer, degraded: bool):
+    ttl = DEGRADED_ANSWER_TTL if degraded else ANSWER_CACHE_TTL
+    if answer and ttl:
+        answer_cache.set(mode, user_input, answer, ttl)
+
+def invoke_agent(user_input, mode=None):
+    mode = mode or AGENT_MODE
+    answer = answer_cache.get(mode, user_input)
+    if answer is None:
+        answer, degraded = run_agent(user_input, mode)
+        remember_answer(user_input, mode, answer, degraded)
+    return answer
+
+async def ainvoke_agent(user_input, mode=None):
+    mode = mode or AGENT_MODE
+    answer = answer_cache.get(mode, user_input)
+    if answer is None:
+        answer, _ = await answer_flight.do(flight_key(user_input, mode), lambda: arun_shared(user_input, mode))
+    return answer
+
+async def astream_agent(user_input, mode=None):
+    """Yield tool_start / tool_end events while tools run, then the answer's tokens as they are generated"""
+    mode = mode or AGENT_MODE
+    answer = answer_cache.get(mode, user_input)
+    if answer is not None:
+        yield {"event": "token", "content": answer}
+        return
+    # concurrent identical streams follow one run's events, and one started by /ask is
+    # sent as a single token once its answer is ready
+    task, feed = answer_flight.join(
+        flight_key(user_input, mode), lambda feed: astream_shared(user_input, mode, feed)
     )
+    streamed = False
+    async for event in feed.follow(task):
+        streamed = streamed or event["event"] == "token"
+        yield event
+    if not streamed:
+        yield {"event": "token", "content": task.result()[0]}
+
+def flight_key(user_input, mode) -> str:
+    return f"{mode}:{normalize(user_input)}"
+
+# every coalesced caller waits on a shared run, so it gets the server's full deadline rather than
+# the first caller's and caches its own answer; each caller still stops waiting at its own deadline
+
+async def arun_shared(user_input, mode):
+    set_deadline(REQUEST_TIMEOUT)
+    answer, degraded = await arun_agent(user_input, mode)
+    remember_answer(user_input, mode, answer, degraded)
+    return answer, degraded
+
+async def astream_shared(user_input, mode, feed):
+    set_deadline(REQUEST_TIMEOUT)
+    tracer = RequestTracer(user_input, mode)
+    tokens = []
+    async for event in astream_run(user_input, mode, tracer):
+        if event["event"] == "token":
+            tokens.append(event["content"])
+        feed.publish(event)
+    answer = "".join(tokens)
+    remember_answer(user_input, mode, answer, tracer.degraded)
+    return answer, tracer.degraded
+
+def run_agent(user_input, mode):
+    """Answer one query, returning the answer and whether any tool result it used was an error"""
+    tracer = RequestTracer(user_input, mode)
+    config = {"callbacks": [tracer]}
+    try:
+        place = extract_destination(user_input) if mode == "fast" else None
+        if place is None:
+            response = agent.invoke({"messages": [("human", user_input)]}, config)
+            answer = response["messages"][-1].content
+        else:
+            answer = llm.invoke(summary_messages(user_input, fan_out(place, config)), config).content
+    except Exception:
+        tracer.finish("error")
+        raise
+    tracer.finish()
+    return answer, tracer.degraded
+
+async def arun_agent(user_input, mode):
+    tracer = RequestTracer(user_input, mode)
+    config = {"callbacks": [tracer]}
+    try:
+        place = extract_destination(user_input) if mode == "fast" else None
+        if place is None:
+            # tool calls from one turn run concurrently through each tool's _arun
+            response = await agent.ainvoke({"messages": [("human", user_input)]}, config)
+            answer = response["messages"][-1].content
+        else:
+            response = await llm.ainvoke(summary_messages(user_input, await afan_out(place, config)), config)
+            answer = response.content
+    except Exception:
+        tracer.finish("error")
+        raise
+    tracer.finish()
+    return answer, tracer.degraded
+
+async def astream_run(user_input, mode, tracer: RequestTracer):
+    # a client that disconnects mid-stream closes the generator without an exception
+    outcome = "cancelled"
+    try:
+        async for event in astream_events(user_input, mode, {"callbacks": [tracer]}):
+            yield event
+        outcome = "ok"
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        tracer.finish(outcome)
+
+async def astream_events(user_input, mode, config):
+    place = extract_destination(user_input) if mode == "fast" else None
+    if place is not None:
+        calls = fan_out_calls(place)
+        for tool, args in calls:
+            yield {"event": "tool_start", "name": tool.name, "input": args}
+
+        async def run(tool, args):
+            try:
+                return tool.name, await tool.ainvoke(args, config)
+            except Exception as e:
+                return tool.name, {"error": str(e)}
+
+        results = {}
+        for finished in asyncio.as_completed([run(tool, args) for tool, args in calls]):
+            name, output = await finished
+            results[name] = output
+            yield {"event": "tool_end", "name": name}
+        async for chunk in llm.astream(summary_messages(user_input, results), config):
+            if chunk.content:
+                yield {"event": "token", "content": chunk.content}
+        return
+
+    async for event in agent.astream_events({"messages": [("human", user_input)]}, config, version="v2"):
+        kind = event["event"]
+        if kind == "on_tool_start":
+            yield {"event": "tool_start", "name": event["name"], "input": event["data"].get("input")}
+        elif kind == "on_tool_end":
+            yield {"event": "tool_end", "name": event["name"]}
+        elif kind == "on_chat_model_stream":
+            chunk = event["data"]["chunk"]
+            # planning turns carry tool call chunks, only answer text is forwarded
+            if chunk.content and not chunk.tool_call_chunks:
+                yield {"event": "token", "content": chunk.content}
+
+# BATCH: compare several destinations with shared, bounded tool fetches and one summarization call
+
+COMPARE_PROMPT = (
+    "You are a travel planner, Cassandra, comparing candidate destinations using the current information gathered about each place such as address details, current news, weather information and related online results."
+    "For every place give a summary of at most 60 words with positive and negative points regarding travelling there."
+    "Then rank the places from most to least recommended for the given travel dates and explain the top choice in one sentence."
 )
 
-def invoke_agent(user_input):
-    response = agent.invoke({"messages": [("human", user_input)]})
-    return response["messages"][-1].content
+class PlaceSummary(BaseModel):
+    place: str = Field(description="place as given in the request")
+    summary: str = Field(description="summary with positive and negative points")
+
+class Comparison(BaseModel):
+    places: list[PlaceSummary] = Field(description="one summary per place")
+    ranking: list[str] = Field(description="places ordered from most to least recommended")
+    recommendation: str = Field(description="one sentence on the top choice")
+
+comparison_llm = llm.with_structured_output(Comparison)
+
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))
+UPSTREAM_CONCURRENCY = int(os.getenv('BATCH_UPSTREAM_CONCURRENCY', 4))
+
+batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+upstream_slots = {tool.name: asyncio.Semaphore(UPSTREAM_CONCURRENCY) for tool in tools}
+tool_flight = SingleFlight()
+
+async def acall_tool(tool, args: dict, config=None):
+    """Run a tool under the per-upstream and global limits, sharing identical in-flight lookups"""
+    async def call():
+        # like arun_shared, a lookup other batches may join gets the server's full deadline
+        set_deadline(REQUEST_TIMEOUT)
+        # the upstream's own slot first, so calls queued on a busy upstream do not hold global slots
+        async with upstream_slots[tool.name], batch_slots:
+            return await tool.ainvoke(args)
+
+    key = f"{tool.name}:{normalize(json.dumps(args, sort_keys=True))}"
+    # the shared call runs untraced and every caller records it as a tool run of its own
+    run_manager = await get_async_callback_manager_for_config(config or {}).on_tool_start(
+        {"name": tool.name}, json.dumps(args), name=tool.name, inputs=args
+    )
+    try:
+        output = await tool_flight.do(key, call)
+    except Exception as e:
+        await run_manager.on_tool_error(e)
+        return {"error": str(e)}
+    await run_manager.on_tool_end(output)
+    return output
+
+def comparison_messages(places: list, travel_dates: Optional[str], results: dict) -> list:
+    sections = "\n\n".join(
+        f"{place}:\n" + "\n".join(
+            f"{name}: {json.dumps(output, ensure_ascii=False, default=str)}" for name, output in results[place].items()
+        )
+        for place in places
+    )
+    dates = f" travelling {travel_dates}" if travel_dates else ""
+    return [
+        SystemMessage(content=COMPARE_PROMPT),
+        HumanMessage(content=f"Compare {', '.join(places)} for a trip{dates}.\n\n{sections}")
+    ]
+
+async def acompare_places(places: list, travel_dates: Optional[str] = None):
+    """Yield each place's tool data as soon as it is fetched, then one ranked comparison of all of them"""
+    # "Dubai" and "dubai " are looked up once, under the first spelling given
+    seen = {}
+    for place in places:
+        seen.setdefault(normalize(place), " ".join(place.split()))
+    unique = list(seen.values())
+    tracer = RequestTracer(", ".join(unique), "compare")
+    config = {"callbacks": [tracer]}
+
+    async def fetch(place):
+        calls = fan_out_calls(place)
+        outputs = await asyncio.gather(*(acall_tool(tool, args, config) for tool, args in calls))
+        return place, {tool.name: output for (tool, _), output in zip(calls, outputs)}
+
+    outcome = "cancelled"
+    try:
+        results = {}
+        for finished in asyncio.as_completed([fetch(place) for place in unique]):
+            place, data = await finished
+            results[place] = data
+            yield {"event": "place", "place": place, "data": data}
+        comparison = await comparison_llm.ainvoke(comparison_messages(unique, travel_dates, results), config)
+        yield {"event": "comparison", **comparison.model_dump()}
+        outcome = "ok"
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        tracer.finish(outcome)
 
 
 
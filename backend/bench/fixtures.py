@@ -0,0 +1,28 @@
+from pathlib import Path
+import ast
+import json
+import re
+
+# Upstream payloads replayed from the recorded Dubai trace at the bottom of agent.py
+
+TRACE_SOURCE = Path(__file__).resolve().parent.parent / "agent.py"
+
+def load_trace() -> dict:
+    """Return the recorded tool payloads keyed by tool name, plus the final answer under "answer\""""
+    source = TRACE_SOURCE.read_text(encoding="utf-8")
+    fixtures = {
+        name: json.loads(ast.literal_eval(content))
+        for content, name in re.findall(r"ToolMessage\(content=('.*?'), name='(\w+)'", source)
+    }
+    answers = re.findall(r"AIMessage\(content=('.+?'), additional_kwargs", source)
+    fixtures["answer"] = ast.literal_eval(answers[-1])
+    return fixtures
+
+def scale(payload: dict, factor: int) -> dict:
+    """Repeat every list in the payload so upstream responses are `factor` times larger"""
+    if factor <= 1:
+        return payload
+    return {
+        key: value * factor if isinstance(value, list) else value
+        for key, value in payload.items()
+    }
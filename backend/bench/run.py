@@ -0,0 +1,225 @@
+"""Offline load test for /ask against local stand-ins for Gemini and the tool APIs.
+
+Run from the backend directory:
+
+    python -m bench.run --requests 200 --concurrency 20 --llm-latency 0.8 --tool-latency 0.3
+
+To drive a backend started separately, e.g. with several workers or a profiler attached, print the
+environment it needs, start it with those variables, then pass its URL with the same ports:
+
+    python -m bench.run --print-env --stub-port 9100 --grpc-port 9101 --tls-dir /tmp/travelbot-bench
+    python -m bench.run --url http://127.0.0.1:8000 --stub-port 9100 --grpc-port 9101 --tls-dir /tmp/travelbot-bench
+"""
+from pathlib import Path
+from prometheus_client.parser import text_string_to_metric_families
+from bench.stubs import StubServer
+from resilience import upstreams
+import argparse
+import asyncio
+import httpx
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    ordered = sorted(values)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+# far above what a bench run sends, so the stubs' latency is measured rather than the free-tier quotas
+UNLIMITED_RATE = "100000"
+
+def rate_limit_env() -> dict:
+    """Lift the backend's per-upstream and Gemini token buckets"""
+    env = {"GEMINI_RATE": UNLIMITED_RATE, "GEMINI_BURST": UNLIMITED_RATE}
+    for name in upstreams:
+        env[f"{name.upper()}_RATE"] = UNLIMITED_RATE
+        env[f"{name.upper()}_BURST"] = UNLIMITED_RATE
+    return env
+
+def stub_env(stub: StubServer, rate_limits: bool = False) -> dict:
+    """Point every upstream the backend talks to at the stub server, lifting rate limits unless asked not to"""
+    stub_url = stub.url
+    env = {} if rate_limits else rate_limit_env()
+    env.update({
+        "GEMINI_API_KEY": "bench",
+        "GEMINI_API_ENDPOINT": stub.gemini_endpoint,
+        # gRPC reads its trusted roots from here, so the stub's self-signed certificate verifies
+        "GRPC_DEFAULT_SSL_ROOTS_FILE_PATH": stub.tls_cert,
+        "TAVILY_API_KEY": "bench",
+        "TAVILY_BASE_URL": stub_url,
+        "WEATHERBIT_API_KEY": "bench",
+        "WEATHERBIT_URL": f"{stub_url}/v2.0/current",
+        "GNEWS_API_KEY": "bench",
+        "GNEWS_URL": f"{stub_url}/api/v4/search",
+        "GPLACES_API_KEY": "bench",
+        "GPLACES_URL": f"{stub_url}/maps/api/geocode/json"
+    })
+    return env
+
+def server_env(stub: StubServer, rate_limits: bool = False) -> dict:
+    env = dict(os.environ)
+    env.update(stub_env(stub, rate_limits))
+    env.pop("TOOL_CACHE_DB", None)
+    return env
+
+def start_backend(stub: StubServer, port: int, workers: int, rate_limits: bool = False) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=server_env(stub, rate_limits)
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("backend exited during startup")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("backend did not start within 30s")
+
+def queries(count: int, destinations: int) -> list:
+    # destinations=0 makes every query unique so no request is served from a cache
+    places = [f"City{i}" for i in range(destinations or count)]
+    return [f"I want to travel to {places[i % len(places)]} in the month of July 2025." for i in range(count)]
+
+async def drive(url: str, user_queries: list, concurrency: int, mode: str, timeout: float):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = {}
+
+    async def ask(client, query):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"{url}/ask", json={"user_query": query, "mode": mode})
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if status == "200":
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors[status] = errors.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(ask(client, query) for query in user_queries))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+def upstream_errors(url: str) -> dict:
+    """The backend's upstream error counters by (upstream, kind), read from /metrics"""
+    # with several workers this is whichever worker answers, so only a share of the run
+    counts = {}
+    text = httpx.get(f"{url}/metrics", timeout=5).text
+    for family in text_string_to_metric_families(text):
+        if family.name != "travelbot_upstream_errors":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_total"):
+                counts[sample.labels["upstream"], sample.labels["kind"]] = sample.value
+    return counts
+
+def report(latencies: list, errors: dict, elapsed: float, stub: StubServer, tool_errors: dict):
+    stats = stub.stats
+    completed = len(latencies)
+    shed = {status: count for status, count in errors.items() if status in ("429", "503", "504")}
+    failed = {status: count for status, count in errors.items() if status not in shed}
+    print(f"requests     {completed} ok, {sum(failed.values())} failed {failed or ''}")
+    print(f"shed         {sum(shed.values())} {shed or ''}")
+    # tool calls that never reached a stub or came back as errors, so answers were built on partial data
+    limited = sum(count for (_, kind), count in tool_errors.items() if kind == "rate_limited")
+    other = {f"{upstream}/{kind}": int(count) for (upstream, kind), count in tool_errors.items()
+             if kind != "rate_limited" and count}
+    print(f"tool errors  {int(limited)} rate limited, {sum(other.values())} other {other or ''}")
+    print(f"throughput   {completed / elapsed:.2f} req/s over {elapsed:.2f}s")
+    if not completed:
+        return
+    print(f"latency      p50 {percentile(latencies, 50):.3f}s  p95 {percentile(latencies, 95):.3f}s  "
+          f"p99 {percentile(latencies, 99):.3f}s  max {max(latencies):.3f}s")
+    llm_seconds = stats.seconds.get("gemini", 0.0)
+    tool_seconds = sum(seconds for upstream, seconds in stats.seconds.items() if upstream != "gemini")
+    tool_calls = sum(calls for upstream, calls in stats.calls.items() if upstream != "gemini")
+    print(f"llm time     {llm_seconds / completed:.3f}s per request over "
+          f"{stats.calls.get('gemini', 0) / completed:.2f} calls")
+    # tool calls within one turn overlap, so this is summed upstream time rather than wall time
+    print(f"tool time    {tool_seconds / completed:.3f}s per request over {tool_calls / completed:.2f} calls")
+    print(f"tokens       {stats.tokens['input'] / completed:.0f} in / "
+          f"{stats.tokens['output'] / completed:.0f} out per request")
+    for upstream in sorted(stats.calls):
+        print(f"  {upstream:<11} {stats.calls[upstream]:>6} calls  "
+              f"{stats.seconds[upstream] / stats.calls[upstream]:.3f}s avg")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mode", choices=["fast", "react"], default="fast")
+    parser.add_argument("--destinations", type=int, default=0,
+                        help="distinct destinations to cycle through, 0 for a unique query per request")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="seconds per Gemini call")
+    parser.add_argument("--tool-latency", type=float, default=0.3, help="seconds per tool API call")
+    parser.add_argument("--jitter", type=float, default=0.1, help="relative latency jitter")
+    parser.add_argument("--payload-scale", type=int, default=1, help="repeat fixture lists this many times")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--stub-port", type=int, default=0, help="fixed port for the stub tool APIs")
+    parser.add_argument("--grpc-port", type=int, default=0, help="fixed port for the stub Gemini service")
+    parser.add_argument("--tls-dir", help="keep the stub Gemini certificate here so it is the same across runs")
+    parser.add_argument("--url", help="drive an already running backend started with the --print-env values")
+    parser.add_argument("--print-env", action="store_true",
+                        help="print the environment a separately started backend needs, then exit")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="keep the backend's production token buckets instead of lifting them")
+    args = parser.parse_args()
+    if (args.url or args.print_env) and not (args.stub_port and args.grpc_port and args.tls_dir):
+        parser.error("--url and --print-env need --stub-port, --grpc-port and --tls-dir")
+
+    stub = StubServer(
+        args.llm_latency, args.tool_latency, args.jitter, args.payload_scale,
+        args.stub_port, args.grpc_port, args.tls_dir
+    ).start()
+    if args.print_env or args.url:
+        for name, value in stub_env(stub, args.rate_limits).items():
+            print(f"export {name}={value}")
+    if args.print_env:
+        stub.stop()
+        return
+    backend = None
+    try:
+        url = args.url
+        if url is None:
+            port = free_port()
+            backend = start_backend(stub, port, args.workers, args.rate_limits)
+            url = f"http://127.0.0.1:{port}"
+        before = upstream_errors(url)
+        latencies, errors, elapsed = asyncio.run(
+            drive(url, queries(args.requests, args.destinations), args.concurrency, args.mode, args.timeout)
+        )
+        after = upstream_errors(url)
+        tool_errors = {key: count - before.get(key, 0) for key, count in after.items()}
+        report(latencies, errors, elapsed, stub, tool_errors)
+    finally:
+        if backend is not None:
+            backend.terminate()
+            backend.wait()
+        stub.stop()
+
+if __name__ == "__main__":
+    main()
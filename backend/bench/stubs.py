@@ -0,0 +1,223 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from google.ai.generativelanguage_v1beta.types import GenerateContentRequest, GenerateContentResponse
+from bench.fixtures import load_trace, scale
+import grpc
+import json
+import os
+import random
+import re
+import subprocess
+import tempfile
+import threading
+import time
+
+# Local stand-ins for Gemini, Tavily, Weatherbit, GNews and Google Geocoding
+
+GEMINI_SERVICE = "google.ai.generativelanguage.v1beta.GenerativeService"
+
+UPSTREAMS = {
+    "/v2.0/current": "weatherbit",
+    "/api/v4/search": "gnews",
+    "/maps/api/geocode/json": "geocoding",
+    "/search": "tavily"
+}
+
+TRACE_TOOLS = {
+    "weatherbit": "weather_tool",
+    "gnews": "news_tool",
+    "geocoding": "places_tool",
+    "tavily": "tavily_search"
+}
+
+class StubStats:
+    """Per-upstream call counts and time spent serving, shared across handler threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.seconds = {}
+        self.tokens = {"input": 0, "output": 0}
+
+    def record(self, upstream: str, seconds: float):
+        with self._lock:
+            self.calls[upstream] = self.calls.get(upstream, 0) + 1
+            self.seconds[upstream] = self.seconds.get(upstream, 0.0) + seconds
+
+    def record_tokens(self, input_tokens: int, output_tokens: int):
+        with self._lock:
+            self.tokens["input"] += input_tokens
+            self.tokens["output"] += output_tokens
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.seconds.clear()
+            self.tokens = {"input": 0, "output": 0}
+
+def self_signed_cert(directory: str) -> tuple:
+    """Write a localhost certificate and key with openssl, the Gemini client only speaks gRPC over TLS"""
+    cert, key = os.path.join(directory, "stub.crt"), os.path.join(directory, "stub.key")
+    # an existing pair is reused so a separately started backend keeps trusting it across runs
+    if os.path.exists(cert) and os.path.exists(key):
+        return cert, key
+    os.makedirs(directory, exist_ok=True)
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", key, "-out", cert, "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost"],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+class StubServer:
+    """Serve the tool APIs over HTTP and Gemini over gRPC, with configurable latency and payload size"""
+
+    def __init__(self, llm_latency: float = 0.8, tool_latency: float = 0.3, jitter: float = 0.1,
+                 payload_scale: int = 1, port: int = 0, grpc_port: int = 0, tls_dir: str = None,
+                 grpc_workers: int = 64):
+        self.llm_latency = llm_latency
+        self.tool_latency = tool_latency
+        self.jitter = jitter
+        self.stats = StubStats()
+        trace = load_trace()
+        self.answer = trace.pop("answer")
+        self.payloads = {
+            upstream: scale(trace[tool], payload_scale) for upstream, tool in TRACE_TOOLS.items()
+        }
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self.tls_tmp = None if tls_dir else tempfile.TemporaryDirectory()
+        self.tls_cert, key = self_signed_cert(tls_dir or self.tls_tmp.name)
+        with open(self.tls_cert, "rb") as cert_file, open(key, "rb") as key_file:
+            credentials = grpc.ssl_server_credentials([(key_file.read(), cert_file.read())])
+        self.grpc_server = grpc.server(ThreadPoolExecutor(max_workers=grpc_workers))
+        self.grpc_server.add_generic_rpc_handlers([self._gemini_handler()])
+        self.grpc_port = self.grpc_server.add_secure_port(f"localhost:{grpc_port}", credentials)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def gemini_endpoint(self) -> str:
+        return f"localhost:{self.grpc_port}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.grpc_server.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.grpc_server.stop(grace=None)
+        if self.tls_tmp is not None:
+            self.tls_tmp.cleanup()
+
+    def delay(self, latency: float):
+        time.sleep(max(0.0, latency + random.uniform(-self.jitter, self.jitter) * latency))
+
+    def gemini(self, request: GenerateContentRequest) -> GenerateContentResponse:
+        """Ask for all four tools on the planning turn and answer once tool results are in the prompt"""
+        started = time.perf_counter()
+        self.delay(self.llm_latency)
+        body = GenerateContentRequest.to_dict(request)
+        has_results = any(
+            part.get("function_response") for item in body.get("contents", []) for part in item.get("parts", [])
+        )
+        functions = {
+            declaration["name"]
+            for tool in body.get("tools", []) for declaration in tool.get("function_declarations", [])
+        }
+        if "Comparison" in functions:
+            parts = [{"function_call": {"name": "Comparison", "args": self.comparison(body)}}]
+        elif body.get("tools") and not has_results:
+            parts = [
+                {"function_call": {"name": "places_tool", "args": {"place": "Dubai"}}},
+                {"function_call": {"name": "news_tool", "args": {"place": "Dubai"}}},
+                {"function_call": {"name": "weather_tool", "args": {"place": "Dubai"}}},
+                {"function_call": {"name": "tavily_search", "args": {"query": "tourism in Dubai"}}}
+            ]
+        else:
+            parts = [{"text": self.answer}]
+        input_tokens = len(json.dumps(body)) // 4
+        output_tokens = len(json.dumps(parts)) // 4
+        self.stats.record_tokens(input_tokens, output_tokens)
+        response = GenerateContentResponse({
+            "candidates": [{"content": {"role": "model", "parts": parts}, "finish_reason": "STOP", "index": 0}],
+            "usage_metadata": {
+                "prompt_token_count": input_tokens,
+                "candidates_token_count": output_tokens,
+                "total_token_count": input_tokens + output_tokens
+            }
+        })
+        self.stats.record("gemini", time.perf_counter() - started)
+        return response
+
+    def comparison(self, body: dict) -> dict:
+        """Structured /compare answer ranking the places in the order the prompt names them"""
+        prompt = " ".join(
+            part.get("text", "") for item in body.get("contents", []) for part in item.get("parts", [])
+        )
+        match = re.search(r"Compare (.+?) for a trip", prompt)
+        places = match.group(1).split(", ") if match else []
+        return {
+            "places": [{"place": place, "summary": self.answer[:200]} for place in places],
+            "ranking": places,
+            "recommendation": f"{places[0]} is the best fit for these dates." if places else ""
+        }
+
+    def _gemini_handler(self):
+        def generate(request, context):
+            return self.gemini(request)
+
+        def stream(request, context):
+            yield self.gemini(request)
+
+        serializers = {
+            "request_deserializer": GenerateContentRequest.deserialize,
+            "response_serializer": GenerateContentResponse.serialize
+        }
+        return grpc.method_handlers_generic_handler(GEMINI_SERVICE, {
+            "GenerateContent": grpc.unary_unary_rpc_method_handler(generate, **serializers),
+            "StreamGenerateContent": grpc.unary_stream_rpc_method_handler(stream, **serializers)
+        })
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                started = time.perf_counter()
+                upstream = UPSTREAMS.get(urlparse(self.path).path)
+                if upstream is None:
+                    self.send_error(404)
+                    return
+                stub.delay(stub.tool_latency)
+                self.send_json(stub.payloads[upstream])
+                stub.stats.record(upstream, time.perf_counter() - started)
+
+            def do_POST(self):
+                started = time.perf_counter()
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if urlparse(self.path).path != "/search":
+                    self.send_error(404)
+                    return
+                stub.delay(stub.tool_latency)
+                self.send_json(stub.payloads["tavily"])
+                stub.stats.record("tavily", time.perf_counter() - started)
+
+        return Handler
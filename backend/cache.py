@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
+import json
+import os
+import sqlite3
+import threading
+import time
+
+load_dotenv()
+
+def normalize(text: str) -> str:
+    """Collapse whitespace and case so that "dubai" and "Dubai " share one key"""
+    return " ".join(text.split()).casefold()
+
+class TTLCache:
+    """In-memory LRU cache with per-entry TTLs and an optional SQLite tier that survives restarts"""
+
+    def __init__(self, maxsize: int = 1024, db_path: Optional[str] = None):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+            )
+            self._db.commit()
+
+    def get(self, namespace: str, key: str):
+        """Return the cached value or None, counting a hit or miss for the namespace"""
+        full_key = f"{namespace}:{normalize(key)}"
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(full_key)
+            if entry is not None and entry[0] <= now:
+                del self._data[full_key]
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT expires_at, value FROM cache WHERE key = ?", (full_key,)
+                ).fetchone()
+                if row is not None and row[0] > now:
+                    entry = (row[0], json.loads(row[1]))
+                    self._store(full_key, entry)
+            if entry is None:
+                self._misses[namespace] = self._misses.get(namespace, 0) + 1
+                return None
+            self._data.move_to_end(full_key)
+            self._hits[namespace] = self._hits.get(namespace, 0) + 1
+            return entry[1]
+
+    def set(self, namespace: str, key: str, value, ttl: float):
+        full_key = f"{namespace}:{normalize(key)}"
+        entry = (time.time() + ttl, value)
+        with self._lock:
+            self._store(full_key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, expires_at, value) VALUES (?, ?, ?)",
+                    (full_key, entry[0], json.dumps(value))
+                )
+                self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+
+    def _store(self, full_key: str, entry):
+        self._data[full_key] = entry
+        self._data.move_to_end(full_key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = set(self._hits) | set(self._misses)
+            return {
+                "size": len(self._data),
+                "hits": sum(self._hits.values()),
+                "misses": sum(self._misses.values()),
+                "by_tool": {
+                    ns: {"hits": self._hits.get(ns, 0), "misses": self._misses.get(ns, 0)}
+                    for ns in sorted(namespaces)
+                }
+            }
+
+tool_cache = TTLCache(
+    maxsize=int(os.getenv('TOOL_CACHE_SIZE', 1024)),
+    db_path=os.getenv('TOOL_CACHE_DB')
+)
@@ -0,0 +1,36 @@
+import httpx
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# Shared keep-alive HTTP clients for the tool APIs
+
+timeout = httpx.Timeout(
+    float(os.getenv('HTTP_TIMEOUT', 10)),
+    connect=float(os.getenv('HTTP_CONNECT_TIMEOUT', 3))
+)
+
+limits = httpx.Limits(
+    max_connections=int(os.getenv('HTTP_MAX_CONNECTIONS', 100)),
+    max_keepalive_connections=int(os.getenv('HTTP_MAX_KEEPALIVE', 20))
+)
+
+# httpx transports only retry failed connection attempts, never a request the upstream already received
+retries = int(os.getenv('HTTP_RETRIES', 2))
+
+sync_client = httpx.Client(
+    timeout=timeout,
+    limits=limits,
+    transport=httpx.HTTPTransport(retries=retries, limits=limits)
+)
+
+async_client = httpx.AsyncClient(
+    timeout=timeout,
+    limits=limits,
+    transport=httpx.AsyncHTTPTransport(retries=retries, limits=limits)
+)
+
+async def aclose_clients():
+    sync_client.close()
+    await async_client.aclose()
@@ -0,0 +1,56 @@
+import asyncio
+
+class Feed:
+    """Events published by one shared run, replayed from the start to every caller following it"""
+
+    def __init__(self):
+        self.events = []
+        self._updated = asyncio.Event()
+
+    def publish(self, event):
+        self.events.append(event)
+        self._wake()
+
+    def _wake(self):
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def follow(self, task: asyncio.Future):
+        """Yield every event of the run until it finishes, then raise its error if it failed"""
+        index = 0
+        while True:
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if task.done():
+                break
+            await self._updated.wait()
+        task.result()
+
+class SingleFlight:
+    """Share one in-flight coroutine between concurrent callers asking for the same key"""
+
+    def __init__(self):
+        self._inflight = {}
+        self.coalesced = 0
+
+    def join(self, key: str, fn) -> tuple:
+        """Return the (task, feed) of the run in flight for key, starting fn(feed) as that run if there is none"""
+        run = self._inflight.get(key)
+        if run is None:
+            feed = Feed()
+            task = asyncio.ensure_future(fn(feed))
+            run = self._inflight[key] = (task, feed)
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            task.add_done_callback(lambda _: feed._wake())
+        else:
+            self.coalesced += 1
+        return run
+
+    async def do(self, key: str, fn):
+        task, _ = self.join(key, lambda feed: fn())
+        # one caller disconnecting must not cancel the run the others are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"inflight": len(self._inflight), "coalesced": self.coalesced}
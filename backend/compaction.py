@@ -0,0 +1,108 @@
+from dotenv import load_dotenv
+from cache import normalize
+import json
+import os
+
+load_dotenv()
+
+# Projection of raw tool payloads down to what the agent needs to write its answer
+
+TOKEN_BUDGET = int(os.getenv('TOOL_TOKEN_BUDGET', 400))
+MAX_ARTICLES = int(os.getenv('NEWS_MAX_ARTICLES', 5))
+MAX_CONTENT_CHARS = int(os.getenv('TOOL_MAX_CONTENT_CHARS', 400))
+
+WEATHER_FIELDS = [
+    "city_name", "country_code", "timezone", "ob_time", "temp", "app_temp", "rh", "clouds",
+    "precip", "snow", "uv", "aqi", "wind_spd", "wind_cdir_full", "sunrise", "sunset"
+]
+
+def estimate_tokens(result) -> int:
+    """Rough token count, about four characters of JSON per token"""
+    return len(json.dumps(result, ensure_ascii=False, default=str)) // 4
+
+def truncate(text, limit: int = MAX_CONTENT_CHARS):
+    if not isinstance(text, str) or len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + "..."
+
+def compact_places(result: dict) -> dict:
+    compacted = {
+        "status": result.get("status"),
+        "results": [
+            {
+                "formatted_address": item.get("formatted_address"),
+                "location": item.get("geometry", {}).get("location"),
+                "types": item.get("types")
+            }
+            for item in result.get("results", [])[:1]
+        ]
+    }
+    if result.get("error_message"):
+        compacted["error_message"] = result["error_message"]
+    return compacted
+
+def compact_weather(result: dict) -> dict:
+    data = []
+    for item in result.get("data", []):
+        fields = {key: item[key] for key in WEATHER_FIELDS if key in item}
+        fields["description"] = (item.get("weather") or {}).get("description")
+        data.append(fields)
+    return {"data": data}
+
+def compact_news(result: dict) -> dict:
+    # syndicated stories show up under several outlets with the same title
+    seen = set()
+    articles = []
+    for article in result.get("articles", []):
+        key = normalize(article.get("title") or "")
+        if key in seen:
+            continue
+        seen.add(key)
+        articles.append({
+            "title": article.get("title"),
+            "description": truncate(article.get("description")),
+            "publishedAt": article.get("publishedAt"),
+            "source": (article.get("source") or {}).get("name")
+        })
+        if len(articles) == MAX_ARTICLES:
+            break
+    return {"articles": articles}
+
+def compact_search(result: dict) -> dict:
+    compacted = {
+        "results": [
+            {"title": item.get("title"), "url": item.get("url"), "content": truncate(item.get("content"))}
+            for item in result.get("results", [])
+        ]
+    }
+    if result.get("answer"):
+        compacted["answer"] = result["answer"]
+    return compacted
+
+COMPACTORS = {
+    "places_tool": compact_places,
+    "weather_tool": compact_weather,
+    "news_tool": compact_news,
+    "tavily_search": compact_search
+}
+
+def fit_budget(result: dict, budget: int = TOKEN_BUDGET) -> dict:
+    """Drop trailing items from the longest list until the payload fits the token budget"""
+    result = dict(result)
+    while estimate_tokens(result) > budget:
+        lists = [key for key, value in result.items() if isinstance(value, list) and len(value) > 1]
+        if not lists:
+            break
+        key = max(lists, key=lambda k: len(result[k]))
+        result[key] = result[key][:-1]
+    return result
+
+def compact(tool_name: str, result):
+    """Project a raw tool payload to its whitelisted fields within the token budget"""
+    compactor = COMPACTORS.get(tool_name)
+    # error payloads and unknown shapes are passed through untouched
+    if compactor is None or not isinstance(result, dict):
+        return result
+    if "error" in result or "errors" in result:
+        return result
+    return fit_budget(compactor(result))
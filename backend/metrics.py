@@ -0,0 +1,156 @@
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import Counter, Gauge, Histogram
+from typing import Optional
+from dotenv import load_dotenv
+import asyncio
+import json
+import logging
+import os
+import time
+
+load_dotenv()
+
+# Prometheus metrics served on /metrics
+
+REQUEST_LATENCY = Histogram(
+    "travelbot_request_seconds", "HTTP request latency", ["route", "status"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "travelbot_requests_in_flight", "HTTP requests currently being served", ["route"]
+)
+LLM_LATENCY = Histogram(
+    "travelbot_llm_round_seconds", "Latency of one Gemini call", ["round"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32)
+)
+LLM_ROUNDS = Histogram(
+    "travelbot_llm_rounds", "Gemini calls per agent run, i.e. ReAct iterations", ["mode"],
+    buckets=(1, 2, 3, 4, 5, 8)
+)
+TOKENS = Counter(
+    "travelbot_llm_tokens_total", "Tokens reported in Gemini usage_metadata", ["direction"]
+)
+TOOL_LATENCY = Histogram(
+    "travelbot_tool_seconds", "Tool call latency including cache hits", ["tool", "outcome"]
+)
+UPSTREAM_ERRORS = Counter(
+    "travelbot_upstream_errors_total", "Failed upstream calls", ["upstream", "kind"]
+)
+CIRCUIT_OPEN = Gauge(
+    "travelbot_circuit_open", "1 while an upstream's circuit breaker is open", ["upstream"]
+)
+REQUESTS_SHED = Counter(
+    "travelbot_requests_shed_total", "Requests rejected by admission control or deadlines", ["status"]
+)
+
+trace_logger = logging.getLogger("travelbot.trace")
+TRACE_LOG = os.getenv('TRACE_LOG', '').lower() in ("1", "true", "yes")
+
+if TRACE_LOG:
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.addHandler(logging.StreamHandler())
+
+def failed_output(output) -> bool:
+    """Whether a tool's output, raw or wrapped in a ToolMessage, is an error payload"""
+    if getattr(output, "status", None) == "error":
+        return True
+    content = getattr(output, "content", output)
+    if isinstance(content, str):
+        try:
+            content = json.loads(content)
+        except ValueError:
+            return False
+    return isinstance(content, dict) and ("error" in content or "errors" in content)
+
+def upstream_error(upstream: str, error: Optional[Exception] = None, kind: str = "error"):
+    if error is not None and "timeout" in type(error).__name__.lower():
+        kind = "timeout"
+    elif isinstance(error, asyncio.CancelledError):
+        kind = "cancelled"
+    UPSTREAM_ERRORS.labels(upstream, kind).inc()
+
+class RequestTracer(BaseCallbackHandler):
+    """Callback handler that times every LLM round and tool call of one agent run"""
+
+    run_inline = True
+
+    def __init__(self, query: str, mode: str):
+        self.query = query
+        self.mode = mode
+        self.started = time.perf_counter()
+        self.spans = []
+        self.rounds = 0
+        # set once any tool failed or answered with an error payload, so the answer is built on partial data
+        self.degraded = False
+        self._open = {}
+
+    def _start(self, run_id, kind: str, name: str):
+        self._open[run_id] = (kind, name, time.perf_counter())
+
+    def _end(self, run_id, outcome: str, **extra):
+        kind, name, started = self._open.pop(run_id, (None, None, None))
+        if kind is None:
+            return None
+        seconds = time.perf_counter() - started
+        self.spans.append({
+            "kind": kind, "name": name, "outcome": outcome,
+            "start": round(started - self.started, 4), "seconds": round(seconds, 4), **extra
+        })
+        return kind, name, seconds
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.rounds += 1
+        self._start(run_id, "llm", str(self.rounds))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self.rounds += 1
+        self._start(run_id, "llm", str(self.rounds))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = {}
+        generations = response.generations[0] if response.generations else []
+        message = getattr(generations[0], "message", None) if generations else None
+        if message is not None and getattr(message, "usage_metadata", None):
+            usage = {
+                "input_tokens": message.usage_metadata.get("input_tokens", 0),
+                "output_tokens": message.usage_metadata.get("output_tokens", 0)
+            }
+            TOKENS.labels("input").inc(usage["input_tokens"])
+            TOKENS.labels("output").inc(usage["output_tokens"])
+        span = self._end(run_id, "ok", **usage)
+        if span:
+            LLM_LATENCY.labels(span[1]).observe(span[2])
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        span = self._end(run_id, "error", error=type(error).__name__)
+        if span:
+            LLM_LATENCY.labels(span[1]).observe(span[2])
+        upstream_error("gemini", error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, "tool", (serialized or {}).get("name") or kwargs.get("name", "tool"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        outcome = "error" if failed_output(output) else "ok"
+        self.degraded = self.degraded or outcome == "error"
+        span = self._end(run_id, outcome)
+        if span:
+            TOOL_LATENCY.labels(span[1], outcome).observe(span[2])
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self.degraded = True
+        span = self._end(run_id, "error", error=type(error).__name__)
+        if span:
+            TOOL_LATENCY.labels(span[1], "error").observe(span[2])
+
+    def finish(self, outcome: str = "ok"):
+        """Record the run's ReAct iterations and, with TRACE_LOG set, log its spans as one JSON line"""
+        LLM_ROUNDS.labels(self.mode).observe(self.rounds)
+        if TRACE_LOG:
+            trace_logger.info(json.dumps({
+                "query": self.query,
+                "mode": self.mode,
+                "outcome": outcome,
+                "seconds": round(time.perf_counter() - self.started, 4),
+                "llm_rounds": self.rounds,
+                "spans": self.spans
+            }, ensure_ascii=False))
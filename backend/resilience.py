@@ -0,0 +1,236 @@
+from contextvars import ContextVar
+from langchain_core.callbacks import BaseCallbackHandler
+from typing import Optional
+from dotenv import load_dotenv
+from metrics import CIRCUIT_OPEN, upstream_error
+import asyncio
+import os
+import threading
+import time
+
+load_dotenv()
+
+class Unavailable(Exception):
+    """An upstream is skipped because its circuit is open, its rate limit is spent or the deadline has passed"""
+
+class Overloaded(Exception):
+    """The server has no room to admit another request"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+# DEADLINES: the request's remaining time budget travels with the asyncio context
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+def set_deadline(seconds: float):
+    return _deadline.set(time.monotonic() + seconds)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None outside a request"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', 30))
+
+def deadline_bound(limit: float) -> bool:
+    """Whether the request's deadline rather than `limit` bounds a call starting now"""
+    left = remaining()
+    return left is not None and left < limit
+
+def budget(limit: float) -> float:
+    """The smaller of `limit` and the time left, raising Unavailable once the deadline has passed"""
+    left = remaining()
+    if left is None:
+        return limit
+    if left <= 0:
+        raise Unavailable("request deadline exceeded")
+    return min(limit, left)
+
+# RATE LIMITS AND CIRCUIT BREAKERS
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token and return 0, or return how long until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float) -> bool:
+        limit = time.monotonic() + timeout
+        while (wait := self._take()) > 0:
+            if time.monotonic() + wait > limit:
+                return False
+            time.sleep(wait)
+        return True
+
+    async def aacquire(self, timeout: float) -> bool:
+        limit = time.monotonic() + timeout
+        while (wait := self._take()) > 0:
+            if time.monotonic() + wait > limit:
+                return False
+            await asyncio.sleep(wait)
+        return True
+
+class CircuitBreaker:
+    """Open after `threshold` consecutive failures, then let calls through again after `reset_timeout`"""
+
+    def __init__(self, name: str, threshold: int, reset_timeout: float):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            # once reset_timeout has passed the circuit is half-open: the next outcome closes or reopens it
+            return self._opened_at is None or time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+        CIRCUIT_OPEN.labels(self.name).set(0)
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures < self.threshold:
+                return
+            self._opened_at = time.monotonic()
+        CIRCUIT_OPEN.labels(self.name).set(1)
+
+RATE_LIMIT_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', 2))
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_RESET = float(os.getenv('BREAKER_RESET_SECONDS', 30))
+
+class Upstream:
+    """Rate limit and circuit breaker for one dependency, configured as <NAME>_RATE and <NAME>_BURST"""
+
+    def __init__(self, name: str, rate: float, burst: float):
+        prefix = name.upper()
+        self.name = name
+        self.bucket = TokenBucket(
+            float(os.getenv(f'{prefix}_RATE', rate)), float(os.getenv(f'{prefix}_BURST', burst))
+        )
+        self.breaker = CircuitBreaker(name, BREAKER_THRESHOLD, BREAKER_RESET)
+
+    def _check(self) -> float:
+        if not self.breaker.allow():
+            upstream_error(self.name, kind="circuit_open")
+            raise Unavailable(f"{self.name} is temporarily unavailable")
+        return budget(RATE_LIMIT_WAIT)
+
+    def record_timeout(self, error: Exception, capped: bool):
+        """Count a timed-out call, against the breaker only if the upstream used up its own full timeout"""
+        # a call cut short by the request's deadline (capped) says nothing about the upstream's health
+        if not capped:
+            self.breaker.failure()
+        upstream_error(self.name, error)
+
+    def _limited(self):
+        upstream_error(self.name, kind="rate_limited")
+        return Unavailable(f"{self.name} rate limit reached")
+
+    def admit(self):
+        """Raise Unavailable unless a call may go out now, blocking briefly for a rate limit token"""
+        if not self.bucket.acquire(self._check()):
+            raise self._limited()
+
+    async def aadmit(self):
+        if not await self.bucket.aacquire(self._check()):
+            raise self._limited()
+
+# defaults sit under each provider's free-tier per-second quota
+upstreams = {
+    "weather_tool": Upstream("weather_tool", rate=5, burst=10),
+    "news_tool": Upstream("news_tool", rate=1, burst=3),
+    "places_tool": Upstream("places_tool", rate=20, burst=40),
+    "tavily_search": Upstream("tavily_search", rate=5, burst=10)
+}
+
+# Gemini calls are rate limited by the chat model's own rate_limiter, only its breaker lives here
+llm_breaker = CircuitBreaker("gemini", BREAKER_THRESHOLD, BREAKER_RESET)
+
+class LLMGuard(BaseCallbackHandler):
+    """Fail Gemini calls fast while its circuit is open and feed call outcomes back into the breaker"""
+
+    run_inline = True
+    raise_error = True
+
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        if not self.breaker.allow():
+            raise Unavailable("gemini is temporarily unavailable")
+
+    def on_llm_end(self, response, **kwargs):
+        self.breaker.success()
+
+    def on_llm_error(self, error, **kwargs):
+        # cancelled calls and calls skipped for the deadline never reached Gemini's verdict
+        if not isinstance(error, (asyncio.CancelledError, Unavailable)):
+            self.breaker.failure()
+
+# ADMISSION: a bounded number of agent runs, a short queue, and fast rejection beyond that
+
+class Slot:
+    """One admitted request's hold on the admission semaphore, safe to release more than once"""
+
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self._semaphore = semaphore
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._semaphore.release()
+
+class Admission:
+    def __init__(self, max_inflight: int, max_queue: int, queue_timeout: float):
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_inflight)
+
+    async def acquire(self) -> Slot:
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return Slot(self._slots)
+        if self.waiting >= self.max_queue:
+            raise Overloaded(429, "Too many requests, please retry shortly")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), budget(self.queue_timeout))
+        except (asyncio.TimeoutError, Unavailable):
+            raise Overloaded(503, "Server is busy, please retry shortly")
+        finally:
+            self.waiting -= 1
+        return Slot(self._slots)
+
+admission = Admission(
+    max_inflight=int(os.getenv('MAX_INFLIGHT', 32)),
+    max_queue=int(os.getenv('MAX_QUEUE', 64)),
+    queue_timeout=float(os.getenv('QUEUE_TIMEOUT', 2))
+)
@@ -1,14 +1,31 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import BaseModel, Field, StringConstraints
+from typing import Annotated, Literal, Optional
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from agent import invoke_agent
+from agent import ainvoke_agent, astream_agent, acompare_places, answer_cache, answer_flight
+from clients import aclose_clients
+from cache import tool_cache
+from metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, REQUESTS_SHED
+from resilience import REQUEST_TIMEOUT, Overloaded, Slot, Unavailable, admission, remaining, set_deadline
+import asyncio
+import json
 import os
+import time
+import weakref
 
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await aclose_clients()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     f"{os.getenv('FRONTEND_URL')}"
@@ -22,18 +39,159 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+class TrackRequests:
+    """ASGI middleware timing each request until its final body chunk, so streamed responses count in full"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        # unknown paths share one label so scanners cannot blow up the series count
+        route = scope["path"] if scope["path"] in ROUTES else "other"
+        REQUESTS_IN_FLIGHT.labels(route).inc()
+        started = time.perf_counter()
+        status = "500"
+        done = False
+
+        def finish():
+            nonlocal done
+            if not done:
+                done = True
+                REQUESTS_IN_FLIGHT.labels(route).dec()
+                REQUEST_LATENCY.labels(route, status).observe(time.perf_counter() - started)
+
+        async def tracked_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, tracked_send)
+        finally:
+            # covers responses that never reach their last chunk, e.g. a client disconnecting mid-stream
+            finish()
+
+app.add_middleware(TrackRequests)
+
+ROUTES = {"/", "/ask", "/ask/stream", "/compare", "/cache", "/metrics"}
+
+@app.get("/metrics")
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/")
 def default():
     return {"response":"on"}
 
+@app.get("/cache")
+def cache_stats():
+    return {
+        "tools": tool_cache.stats(),
+        "answers": {**answer_cache.stats(), **answer_flight.stats()}
+    }
+
 class UserInput(BaseModel):
     user_query: str
+    # "fast" fans out to every tool then summarizes once, "react" always runs the full agent
+    mode: Optional[Literal["fast", "react"]] = None
+
+async def admit(request: Request) -> Slot:
+    """Start the request's deadline and take an admission slot, shedding load with 429/503 when full"""
+    # clients may ask for a tighter deadline than the server's own with X-Request-Timeout
+    try:
+        seconds = float(request.headers.get("X-Request-Timeout", REQUEST_TIMEOUT))
+    except ValueError:
+        seconds = REQUEST_TIMEOUT
+    set_deadline(max(0.1, min(seconds, REQUEST_TIMEOUT)))
+    try:
+        return await admission.acquire()
+    except Overloaded as e:
+        REQUESTS_SHED.labels(str(e.status_code)).inc()
+        raise HTTPException(e.status_code, e.detail, headers={"Retry-After": "1"})
 
 @app.post("/ask")
-def invoke_llm(user_input: UserInput):
-    # llm call
-    response = invoke_agent(user_input.user_query)
+async def invoke_llm(user_input: UserInput, request: Request):
+    slot = await admit(request)
+    try:
+        # llm call
+        response = await asyncio.wait_for(ainvoke_agent(user_input.user_query, user_input.mode), remaining())
+    except asyncio.TimeoutError:
+        REQUESTS_SHED.labels("504").inc()
+        raise HTTPException(504, "Deadline exceeded")
+    except Unavailable as e:
+        REQUESTS_SHED.labels("503").inc()
+        raise HTTPException(503, str(e), headers={"Retry-After": "5"})
+    finally:
+        slot.release()
     return {"response": response}
 
+def sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+class AdmittedStream(StreamingResponse):
+    """Streaming response that gives its admission slot back however the response ends"""
+
+    def __init__(self, content, slot: Slot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+        # a response that is never sent, so its body never runs, still frees the slot once dropped
+        weakref.finalize(self, slot.release)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+def sse_response(events, slot: Slot) -> StreamingResponse:
+    """Serve an admitted request's events as Server-Sent Events, each step bounded by its deadline"""
+    async def body():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(anext(events), remaining())
+                except StopAsyncIteration:
+                    break
+                yield sse(event)
+        except asyncio.TimeoutError:
+            REQUESTS_SHED.labels("504").inc()
+            yield sse({"event": "error", "detail": "Deadline exceeded"})
+            return
+        except Exception as e:
+            yield sse({"event": "error", "detail": str(e)})
+            return
+        finally:
+            slot.release()
+        yield sse({"event": "done"})
+
+    return AdmittedStream(
+        body(),
+        slot,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/ask/stream")
+async def stream_llm(user_input: UserInput, request: Request):
+    # same query as /ask, answered as Server-Sent Events
+    slot = await admit(request)
+    return sse_response(astream_agent(user_input.user_query, user_input.mode), slot)
+
+class CompareInput(BaseModel):
+    # blank entries would send empty lookups to every upstream
+    places: list[Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]] = Field(min_length=1, max_length=int(os.getenv('COMPARE_MAX_PLACES', 10)))
+    travel_dates: Optional[str] = None
+
+@app.post("/compare")
+async def compare_places(compare_input: CompareInput, request: Request):
+    # one "place" event per destination as its lookups finish, then the ranked "comparison"
+    slot = await admit(request)
+    return sse_response(acompare_places(compare_input.places, compare_input.travel_dates), slot)
+
 if __name__ == "__main__":
     uvicorn.run(app=app, host="0.0.0.0", port=8000)
\ No newline at end of file
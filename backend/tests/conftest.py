@@ -0,0 +1,33 @@
+import os
+import pytest
+import sys
+
+# backend modules import each other as top-level modules, as when the server runs from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the chat model and Tavily client refuse to build without keys, no test calls them
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("TAVILY_API_KEY", "test")
+
+
+class Clock:
+    """Stand-in for the time module whose clock only moves when a test advances it or sleeps"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return Clock()
@@ -0,0 +1,70 @@
+import asyncio
+import agent
+
+EVENTS = [
+    {"event": "tool_start", "name": "weather_tool", "input": {"place": "Dubai"}},
+    {"event": "tool_end", "name": "weather_tool"},
+    {"event": "token", "content": "Dubai is "},
+    {"event": "token", "content": "hot in July."}
+]
+
+def fake_runs(monkeypatch):
+    """Replace the agent runs with ones that count how often they start"""
+    runs = []
+
+    async def astream_run(user_input, mode, tracer):
+        runs.append(user_input)
+        for event in EVENTS:
+            await asyncio.sleep(0.01)
+            yield event
+
+    async def arun_agent(user_input, mode):
+        runs.append(user_input)
+        await asyncio.sleep(0.05)
+        return "Dubai is hot in July.", False
+
+    monkeypatch.setattr(agent, "astream_run", astream_run)
+    monkeypatch.setattr(agent, "arun_agent", arun_agent)
+    return runs
+
+async def collect(query):
+    return [event async for event in agent.astream_agent(query, "fast")]
+
+def test_concurrent_identical_streams_share_one_run(monkeypatch):
+    runs = fake_runs(monkeypatch)
+
+    async def main():
+        return await asyncio.gather(*(collect("Visit Dubai in July") for _ in range(5)))
+
+    streams = asyncio.run(main())
+    assert len(runs) == 1
+    assert all(events == EVENTS for events in streams)
+    # the shared run cached its answer for the next caller
+    assert agent.answer_cache.get("fast", "visit dubai in july") == "Dubai is hot in July."
+
+def test_stream_joining_an_ask_run_gets_its_answer(monkeypatch):
+    runs = fake_runs(monkeypatch)
+
+    async def main():
+        ask = asyncio.ensure_future(agent.ainvoke_agent("Weather in Oslo", "fast"))
+        await asyncio.sleep(0)
+        events = await collect("weather in oslo")
+        return await ask, events
+
+    answer, events = asyncio.run(main())
+    assert len(runs) == 1
+    assert events == [{"event": "token", "content": answer}]
+
+def test_a_failed_run_fails_every_follower(monkeypatch):
+    async def astream_run(user_input, mode, tracer):
+        yield EVENTS[0]
+        await asyncio.sleep(0.01)
+        raise RuntimeError("gemini is temporarily unavailable")
+
+    monkeypatch.setattr(agent, "astream_run", astream_run)
+
+    async def main():
+        return await asyncio.gather(*(collect("Trip to Lima") for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(main()))
+    assert agent.answer_cache.get("fast", "Trip to Lima") is None
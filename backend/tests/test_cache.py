@@ -0,0 +1,53 @@
+import cache
+import pytest
+from cache import TTLCache, normalize
+
+@pytest.fixture(autouse=True)
+def frozen_time(monkeypatch, clock):
+    monkeypatch.setattr(cache, "time", clock)
+
+def test_normalize_collapses_whitespace_and_case():
+    assert normalize("  New   York\n") == "new york"
+    assert normalize("STRASSE") == normalize("straße")
+
+def test_keys_are_normalized_within_a_namespace():
+    store = TTLCache()
+    store.set("weather_tool", "Dubai ", {"temp": 29}, ttl=60)
+    assert store.get("weather_tool", "dubai") == {"temp": 29}
+    assert store.get("news_tool", "dubai") is None
+
+def test_entries_expire_after_their_ttl(clock):
+    store = TTLCache()
+    store.set("weather_tool", "Dubai", {"temp": 29}, ttl=60)
+    clock.advance(59)
+    assert store.get("weather_tool", "Dubai") == {"temp": 29}
+    clock.advance(1)
+    assert store.get("weather_tool", "Dubai") is None
+    assert store.stats()["size"] == 0
+
+def test_least_recently_used_entry_is_evicted():
+    store = TTLCache(maxsize=2)
+    store.set("places_tool", "Dubai", 1, ttl=60)
+    store.set("places_tool", "Oslo", 2, ttl=60)
+    store.get("places_tool", "Dubai")
+    store.set("places_tool", "Rome", 3, ttl=60)
+    assert store.get("places_tool", "Oslo") is None
+    assert store.get("places_tool", "Dubai") == 1
+    assert store.get("places_tool", "Rome") == 3
+
+def test_hits_and_misses_are_counted_per_namespace():
+    store = TTLCache()
+    store.set("weather_tool", "Dubai", 1, ttl=60)
+    store.get("weather_tool", "Dubai")
+    store.get("weather_tool", "Oslo")
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["by_tool"]["weather_tool"] == {"hits": 1, "misses": 1}
+
+def test_sqlite_tier_survives_a_restart(tmp_path, clock):
+    db_path = str(tmp_path / "cache.db")
+    TTLCache(db_path=db_path).set("places_tool", "Dubai", {"status": "OK"}, ttl=60)
+    restarted = TTLCache(db_path=db_path)
+    assert restarted.get("places_tool", "dubai") == {"status": "OK"}
+    clock.advance(61)
+    assert TTLCache(db_path=db_path).get("places_tool", "Dubai") is None
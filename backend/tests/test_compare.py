@@ -0,0 +1,36 @@
+import json
+import httpx
+import pytest
+from bench.run import free_port, start_backend
+from bench.stubs import StubServer
+
+@pytest.fixture(scope="module")
+def backend_url():
+    """A backend process whose Gemini and tool APIs are the bench stubs"""
+    stub = StubServer(llm_latency=0.05, tool_latency=0.05, jitter=0).start()
+    port = free_port()
+    backend = start_backend(stub, port, workers=1)
+    yield f"http://127.0.0.1:{port}"
+    backend.terminate()
+    backend.wait()
+    stub.stop()
+
+def events(response: httpx.Response) -> list:
+    return [
+        json.loads(line.removeprefix("data: ")) for line in response.text.splitlines() if line.startswith("data: ")
+    ]
+
+def test_compare_streams_each_place_then_the_ranking(backend_url):
+    response = httpx.post(
+        f"{backend_url}/compare", json={"places": ["Dubai", " dubai", "Oslo"], "travel_dates": "July"}, timeout=30
+    )
+    assert response.status_code == 200
+    stream = events(response)
+    assert [event["event"] for event in stream] == ["place", "place", "comparison", "done"]
+    assert {event["place"] for event in stream[:2]} == {"Dubai", "Oslo"}
+    assert stream[2]["ranking"] == ["Dubai", "Oslo"]
+
+@pytest.mark.parametrize("places", [[], [""], ["Dubai", "   "]])
+def test_compare_rejects_missing_or_blank_places(backend_url, places):
+    response = httpx.post(f"{backend_url}/compare", json={"places": places}, timeout=30)
+    assert response.status_code == 422
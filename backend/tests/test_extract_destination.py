@@ -0,0 +1,27 @@
+import pytest
+from agent import extract_destination
+
+@pytest.mark.parametrize("query, expected", [
+    ("Dubai", "Dubai"),
+    ("New York", "New York"),
+    ("I want to travel to Dubai in the month of July 2025.", "Dubai"),
+    ("Hi, I'm planning a trip to Paris", "Paris"),
+    ("I want to go to Dubai. Is it safe?", "Dubai"),
+    ("I'd love to visit New Zealand", "New Zealand"),
+    ("I've heard good things about Kyoto. What should I see there?", "Kyoto"),
+    ("I’m heading to Tokyo next week", "Tokyo"),
+    ("Is it worth travelling to Paris I wonder", "Paris"),
+    ("What's the weather like in Lisbon in June?", "Lisbon"),
+    ("Tell me about Rome", "Rome"),
+    ("Plan a trip to Cape Town. Thanks!", "Cape Town"),
+    ("Should I go to Lisbon or Porto?", None),
+    ("Rome or Oslo? Flights to Oslo look cheaper.", None),
+    ("Barcelona was great last year. This time I want to visit Lisbon.", None),
+    ("Oslo is lovely. I want to visit Bergen.", None),
+    ("Flights from London to Paris", None),
+    ("Compare Rome and Florence", None),
+    ("What's the weather like in July?", None),
+    ("plan my trip", None),
+])
+def test_extract_destination(query, expected):
+    assert extract_destination(query) == expected
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+import resilience
+from resilience import (
+    Admission, CircuitBreaker, Overloaded, TokenBucket, Unavailable, Upstream, budget, deadline_bound, set_deadline
+)
+
+@pytest.fixture(autouse=True)
+def frozen_time(monkeypatch, clock):
+    monkeypatch.setattr(resilience, "time", clock)
+
+@pytest.fixture
+def deadline():
+    """Set a request deadline for one test and clear it afterwards"""
+    tokens = []
+    yield lambda seconds: tokens.append(set_deadline(seconds))
+    for token in reversed(tokens):
+        resilience._deadline.reset(token)
+
+def test_token_bucket_allows_a_burst_then_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert all(bucket.acquire(timeout=0) for _ in range(3))
+    assert not bucket.acquire(timeout=0.4)
+    clock.advance(0.5)
+    assert bucket.acquire(timeout=0)
+
+def test_token_bucket_waits_for_a_token_within_its_timeout(clock):
+    bucket = TokenBucket(rate=2, capacity=1)
+    assert bucket.acquire(timeout=0)
+    started = clock.now
+    assert bucket.acquire(timeout=1)
+    assert clock.now - started == pytest.approx(0.5)
+
+def test_breaker_opens_after_consecutive_failures_only():
+    breaker = CircuitBreaker("test", threshold=3, reset_timeout=30)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert not breaker.allow()
+
+def test_breaker_half_opens_after_reset_timeout(clock):
+    breaker = CircuitBreaker("test", threshold=1, reset_timeout=30)
+    breaker.failure()
+    clock.advance(29)
+    assert not breaker.allow()
+    clock.advance(1)
+    assert breaker.allow()
+    # a failed trial call reopens it for another reset_timeout, a successful one closes it
+    breaker.failure()
+    assert not breaker.allow()
+    clock.advance(30)
+    breaker.success()
+    assert breaker.allow()
+
+def test_budget_is_capped_by_the_request_deadline(deadline, clock):
+    assert budget(10) == 10
+    assert not deadline_bound(10)
+    deadline(2)
+    assert budget(10) == pytest.approx(2)
+    assert deadline_bound(10)
+    clock.advance(2)
+    with pytest.raises(Unavailable):
+        budget(10)
+
+def test_only_uncapped_timeouts_count_against_the_breaker():
+    upstream = Upstream("test_upstream", rate=1, burst=1)
+    for _ in range(resilience.BREAKER_THRESHOLD):
+        upstream.record_timeout(TimeoutError(), capped=True)
+    assert upstream.breaker.allow()
+    for _ in range(resilience.BREAKER_THRESHOLD):
+        upstream.record_timeout(TimeoutError(), capped=False)
+    assert not upstream.breaker.allow()
+    with pytest.raises(Unavailable):
+        upstream.admit()
+
+def test_admission_queues_then_sheds_with_429_and_503(monkeypatch):
+    # real time here, the queue timeout is an asyncio wait
+    monkeypatch.undo()
+
+    async def main():
+        admission = Admission(max_inflight=1, max_queue=1, queue_timeout=0.05)
+        slot = await admission.acquire()
+        queued = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await admission.acquire()
+        with pytest.raises(Overloaded) as timed_out:
+            await queued
+        slot.release()
+        slot.release()
+        # releasing twice frees one slot, not two
+        again = await admission.acquire()
+        return full.value.status_code, timed_out.value.status_code, admission.waiting, admission._slots.locked()
+
+    assert asyncio.run(main()) == (429, 503, 0, True)
+
+def test_queued_request_gets_the_released_slot(monkeypatch):
+    monkeypatch.undo()
+
+    async def main():
+        admission = Admission(max_inflight=1, max_queue=1, queue_timeout=1)
+        slot = await admission.acquire()
+        queued = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        slot.release()
+        (await queued).release()
+        return admission._slots.locked()
+
+    assert asyncio.run(main()) is False
@@ -0,0 +1,30 @@
+import json
+import httpx
+import agent
+from cache import tool_cache
+from metrics import failed_output
+
+def response(status_code: int, body: bytes) -> httpx.Response:
+    return httpx.Response(status_code, content=body, request=httpx.Request("GET", "http://upstream"))
+
+def test_places_payload_without_ok_status_is_an_uncached_error():
+    body = b'{"status": "OVER_QUERY_LIMIT", "error_message": "quota", "results": []}'
+    result = agent.getplaces_tool._remember("Quotaville", response(200, body))
+    assert failed_output(result)
+    assert tool_cache.get("places_tool", "Quotaville") is None
+
+def test_places_payload_with_ok_status_is_cached():
+    body = b'{"status": "OK", "results": []}'
+    result = agent.getplaces_tool._remember("Okville", response(200, body))
+    assert not failed_output(result)
+    assert tool_cache.get("places_tool", "Okville") == result
+
+def test_non_json_success_is_an_uncached_error():
+    result = agent.getweather_tool._remember("Emptyville", response(204, b""))
+    assert failed_output(result)
+    assert tool_cache.get("weather_tool", "Emptyville") is None
+
+def test_tavily_exception_payload_becomes_json():
+    result = agent.search_tool._remember("broken query", {"error": ConnectionError("unreachable")})
+    assert json.loads(json.dumps(result)) == {"error": "unreachable"}
+    assert failed_output(json.dumps(result))
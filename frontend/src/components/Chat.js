@@ -1,17 +1,16 @@
 "use client"
 import { useState, useEffect } from "react";
 import toast from 'react-hot-toast';
-import axios from "axios";
+
+const initialMessage = "Hello, I'm your AI Travel Guide. I help you know about your destination before you travel.";
 
 export const Chat = () => {
     const [userInput, setUserInput] = useState("");
     const [isLoading, setIsLoading] = useState(false);
-    const [aiResponse, setAIResponse] = useState("");
     const [displayText, setDisplayText] = useState("");
     const [typingIndex, setTypingIndex] = useState(0);
     const [isTyping, setIsTyping] = useState(false);
     const [targetText, setTargetText] = useState("");
-    const initialMessage = "Hello, I'm your AI Travel Guide. I help you know about your destination before you travel.";
 
     // Typing effect controller
     useEffect(() => {
@@ -27,26 +26,16 @@ export const Chat = () => {
         }
     }, [typingIndex, isTyping, targetText]);
 
-    // Handle text updates
+    // Start typing initial message
     useEffect(() => {
-        if (aiResponse) {
-            // Start typing AI response
-            setTargetText(aiResponse);
-            setDisplayText('');
-            setTypingIndex(0);
-            setIsTyping(true);
-        } else {
-            // Start typing initial message
-            setTargetText(initialMessage);
-            setDisplayText('');
-            setTypingIndex(0);
-            setIsTyping(true);
-        }
-    }, [aiResponse]);
+        setTargetText(initialMessage);
+        setDisplayText('');
+        setTypingIndex(0);
+        setIsTyping(true);
+    }, []);
   
     const askHandler = async () => {
         setIsLoading(true);
-        setAIResponse("");
         try {
             if (userInput == "") {
                 setIsLoading(false);
@@ -54,12 +43,45 @@ export const Chat = () => {
                 return
             }
 
-            const response = await axios.post(`${process.env.NEXT_PUBLIC_BACKEND_URL}/ask`, {
-                user_query: userInput
+            const response = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_URL}/ask/stream`, {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ user_query: userInput })
             })
+            if (!response.ok) {
+                throw new Error(`Request failed with status ${response.status}`)
+            }
 
-            console.log("response", response.data.response)
-            setAIResponse(response.data.response)
+            // Render answer tokens as the backend streams them
+            setIsTyping(false);
+            setTargetText("");
+            setDisplayText("");
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
+            try {
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+                    const frames = buffer.split("\n\n");
+                    buffer = frames.pop();
+                    for (const frame of frames) {
+                        const data = frame.split("\n").find(line => line.startsWith("data: "));
+                        if (!data) continue;
+                        const event = JSON.parse(data.slice(6));
+                        if (event.event == "token") {
+                            setDisplayText(prev => prev + event.content);
+                        } else if (event.event == "error") {
+                            throw new Error(event.detail);
+                        }
+                    }
+                }
+            } catch (err) {
+                // Stop reading so the connection is released before reporting the failure
+                reader.cancel();
+                throw err;
+            }
 
             setIsLoading(false);
             toast.success("Response received!")
@@ -87,22 +109,13 @@ export const Chat = () => {
                     <div className="w-full h-[40%] p-4 border border-gray-200 bg-white">
                         <div className="grid grid-cols-3">
                             <div className="col-span-3 h-full">
-                                {!aiResponse ? 
-                                    <p className="mx-2 my-2 font-normal text-gray-500 whitespace-pre-wrap">
-                                    {displayText}
-                                        {isTyping && (
-                                        <span className="ml-1 border-r-2 border-black animate-blink"></span>
-                                        )
-                                    }
-                                    </p> : 
-                                    <p className="mx-2 my-2 font-normal text-gray-500 whitespace-pre-wrap">
-                                    {displayText}
-                                        {isTyping && (
-                                        <span className="ml-1 border-r-2 border-black animate-blink"></span>
-                                        )
-                                    }
-                                    </p>
+                                <p className="mx-2 my-2 font-normal text-gray-500 whitespace-pre-wrap">
+                                {displayText}
+                                    {isTyping && (
+                                    <span className="ml-1 border-r-2 border-black animate-blink"></span>
+                                    )
                                 }
+                                </p>
                             </div>
                         </div>
                     </div>